@@ -7,6 +7,7 @@
 #############################################################################
 
 try:
+    import os
     import time
     from sonic_platform_base.sonic_xcvr.sfp_optoe_base import SfpOptoeBase
     from .helper import APIHelper
@@ -16,9 +17,59 @@ except ImportError as e:
 FPGA_PCIE_PATH = "/sys/devices/platform/as9817_64_fpga/"
 EEPROM_PATH = '/sys/bus/i2c/devices/{}-00{}/eeprom'
 
+# Presence is re-read at most once per this many seconds
+PRESENCE_CACHE_TTL = 0.05
+
+def _read_flag(path):
+    """
+    Reads a single-digit sysfs flag with raw os.read(), skipping the
+    buffered text file and int() parsing of APIHelper.read_txt_file()
+    Returns:
+        A Boolean, True if the flag is 1, None if the file can't be read
+    """
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return None
+
+    try:
+        return os.read(fd, 2)[:1] == b'1'
+    except OSError:
+        return None
+    finally:
+        os.close(fd)
+
+def _write_flag(path, flag):
+    """
+    Writes b'1' or b'0' to a sysfs flag with raw os.write()
+    Returns:
+        A Boolean, True if the flag is written successfully, False if not
+    """
+    try:
+        fd = os.open(path, os.O_WRONLY)
+    except OSError:
+        return False
+
+    try:
+        os.write(fd, b'1' if flag else b'0')
+    except OSError:
+        return False
+    finally:
+        os.close(fd)
+
+    return True
+
 class Sfp(SfpOptoeBase):
     """Platform-specific Sfp class"""
 
+    # SfpOptoeBase has no __slots__, so instances keep a __dict__ for the
+    # base class attributes; the per-port state below lives in slots.
+    __slots__ = (
+        'port_num', 'index', 'name', 'sfp_type', '_api_helper',
+        '_reset_path', '_lpmode_path', '_present_path', '_txdisable_path',
+        '_eeprom_path', '_presence_cache', '_last_presence', '_sfp_type_valid'
+    )
+
     # Port number
     PORT_START = 1
     PORT_END = 66
@@ -41,6 +92,12 @@ class Sfp(SfpOptoeBase):
         0x19  # OSFP
     ]
 
+    # Sets of the lists above for membership tests
+    SFP_TYPE_CODE_SET = frozenset(SFP_TYPE_CODE_LIST)
+    QSFP_TYPE_CODE_SET = frozenset(QSFP_TYPE_CODE_LIST)
+    QSFP_DD_TYPE_CODE_SET = frozenset(QSFP_DD_TYPE_CODE_LIST)
+    OSFP_TYPE_CODE_SET = frozenset(OSFP_TYPE_CODE_LIST)
+
     SFP_TYPE = "SFP"
     QSFP_TYPE = "QSFP"
     OSFP_TYPE = "OSFP"
@@ -50,26 +107,6 @@ class Sfp(SfpOptoeBase):
     EEPROM_DATA_NOT_READY = "eeprom not ready"
     UNKNOWN_SFP_TYPE_ID = "unknow sfp ID"
 
-    _port_to_i2c_mapping = {
-         1:2,   2:3,   3:4,   4:5,
-         5:6,   6:7,   7:8,   8:9,
-         9:10, 10:11, 11:12, 12:13,
-        13:14, 14:15, 15:16, 16:17,
-        17:18, 18:19, 19:20, 20:21,
-        21:22, 22:23, 23:24, 24:25,
-        25:26, 26:27, 27:28, 28:29,
-        29:30, 30:31, 31:32, 32:33,
-        33:34, 34:35, 35:36, 36:37,
-        37:38, 38:39, 39:40, 40:41,
-        41:42, 42:43, 43:44, 44:45,
-        45:46, 46:47, 47:48, 48:49,
-        49:50, 50:51, 51:52, 52:53,
-        53:54, 54:55, 55:56, 56:57,
-        57:58, 58:59, 59:60, 60:61,
-        61:62, 62:63, 63:64, 64:65,
-        65:66, 66:67,
-    }
-
     def __init__(self, sfp_index=0, intf_name="Unknown"):
         SfpOptoeBase.__init__(self)
         self._api_helper=APIHelper()
@@ -80,19 +117,26 @@ class Sfp(SfpOptoeBase):
 
         self.name = intf_name
 
-        # Init eeprom path
-        self.port_to_eeprom_mapping = {}
-        for x in range(self.PORT_START, self.PORT_END + 1):
-            self.port_to_eeprom_mapping[x] = EEPROM_PATH.format(
-                self._port_to_i2c_mapping[x], "50")
+        # Init sysfs paths
+        self._reset_path = "{}module_reset_{}".format(FPGA_PCIE_PATH, self.port_num)
+        self._lpmode_path = "{}module_lp_mode_{}".format(FPGA_PCIE_PATH, self.port_num)
+        self._present_path = "{}module_present_{}".format(FPGA_PCIE_PATH, self.port_num)
+        self._txdisable_path = "{}module_tx_disable_{}".format(FPGA_PCIE_PATH, self.port_num)
+
+        # (timestamp, presence) of the last module_present read
+        self._presence_cache = (0.0, False)
+        self._last_presence = None
+        self._sfp_type_valid = False
+
+        # Init eeprom path, port N sits on i2c bus N+1
+        self._eeprom_path = EEPROM_PATH.format(self.port_num + 1, "50")
 
         # SONiC will use 'sfp_type' for configuring the media type.
         self.sfp_type = self.QSFP_TYPE
         self.update_sfp_type()
 
     def get_eeprom_path(self):
-        # print(self.port_to_eeprom_mapping[self.port_num])
-        return self.port_to_eeprom_mapping[self.port_num]
+        return self._eeprom_path
 
     def get_reset_status(self):
         """
@@ -100,13 +144,7 @@ class Sfp(SfpOptoeBase):
         Returns:
             A Boolean, True if reset enabled, False if disabled
         """
-        reset_path = "{}{}{}".format(FPGA_PCIE_PATH, 'module_reset_', self.port_num)
-
-        val = self._api_helper.read_txt_file(reset_path)
-        if val is not None:
-            return int(val, 10) == 1
-
-        return False
+        return _read_flag(self._reset_path) is True
 
     def get_lpmode(self):
         """
@@ -118,17 +156,12 @@ class Sfp(SfpOptoeBase):
             # SFP doesn't support this feature
             return False
 
+        self.update_sfp_type()
         if self.sfp_type in [self.QSFP_DD_TYPE, self.OSFP_TYPE]:
             api = self.get_xcvr_api()
             return api.get_lpmode()
         else:
-            lpmode_path = "{}{}{}".format(FPGA_PCIE_PATH, '/module_lp_mode_', self.port_num)
-
-            val=self._api_helper.read_txt_file(lpmode_path)
-            if val is not None:
-                return int(val, 10)==1
-
-        return False
+            return _read_flag(self._lpmode_path) is True
 
     def reset(self):
         """
@@ -143,16 +176,25 @@ class Sfp(SfpOptoeBase):
         if self.port_num > 64:
             return False # SFP doesn't support this feature
 
-        reset_path = "{}{}{}".format(FPGA_PCIE_PATH, 'module_reset_', self.port_num)
-        ret = self._api_helper.write_txt_file(reset_path, 1)
-        if ret is not True:
-            return ret
+        # Keep module_reset open across assert and release of the reset pin
+        try:
+            fd = os.open(self._reset_path, os.O_WRONLY)
+        except OSError:
+            return False
+
+        try:
+            os.write(fd, b'1')
+            time.sleep(0.2)
+            os.write(fd, b'0')
+        except OSError:
+            return False
+        finally:
+            os.close(fd)
 
         time.sleep(0.2)
-        ret = self._api_helper.write_txt_file(reset_path, 0)
-        time.sleep(0.2)
+        self.invalidate_presence()
 
-        return ret
+        return True
 
     def set_lpmode(self, lpmode):
         """
@@ -169,16 +211,12 @@ class Sfp(SfpOptoeBase):
         if self.port_num > 64:
             return False # SFP doesn't support this feature
 
+        self.update_sfp_type()
         if self.sfp_type in [self.QSFP_DD_TYPE, self.OSFP_TYPE]:
             api = self.get_xcvr_api()
             ret = api.set_lpmode(lpmode)
         else:
-            lpmode_path = "{}{}{}".format(FPGA_PCIE_PATH, 'module_lp_mode_', self.port_num)
-
-            if lpmode is True:
-                ret = self._api_helper.write_txt_file(lpmode_path, 1) #enable lpmode
-            else:
-                ret = self._api_helper.write_txt_file(lpmode_path, 0) #disable lpmode
+            ret = _write_flag(self._lpmode_path, lpmode is True)
 
         return ret
 
@@ -201,12 +239,7 @@ class Sfp(SfpOptoeBase):
 
             ret = api.tx_disable(tx_disable)
         else:
-            txdisable_path = "{}{}{}".format(FPGA_PCIE_PATH, 'module_tx_disable_', self.port_num)
-
-            if tx_disable is True:
-                ret = self._api_helper.write_txt_file(txdisable_path, 1) #enable tx_disable
-            else:
-                ret = self._api_helper.write_txt_file(txdisable_path, 0) #disable tx_disable
+            ret = _write_flag(self._txdisable_path, tx_disable is True)
 
         return ret
 
@@ -224,13 +257,28 @@ class Sfp(SfpOptoeBase):
         Returns:
             bool: True if device is present, False if not
         """
-        present_path = "{}{}{}".format(FPGA_PCIE_PATH, '/module_present_', self.port_num)
+        now = time.monotonic()
+        ts, presence = self._presence_cache
+        if now - ts < PRESENCE_CACHE_TTL:
+            return presence
 
-        val = self._api_helper.read_txt_file(present_path)
-        if val is not None:
-            return int(val, 10)==1
+        presence = _read_flag(self._present_path) is True
+        self._presence_cache = (now, presence)
 
-        return False
+        if presence and not self._last_presence:
+            # A module was (re)inserted, its type and xcvr api are rebuilt
+            # from the new EEPROM on next use
+            self._sfp_type_valid = False
+            self._xcvr_api = None
+        self._last_presence = presence
+
+        return presence
+
+    def invalidate_presence(self):
+        """
+        Drops the cached presence so the next get_presence() reads sysfs
+        """
+        self._presence_cache = (0.0, False)
 
     def get_status(self):
         """
@@ -265,23 +313,29 @@ class Sfp(SfpOptoeBase):
         if not self.get_presence():
             return self.EEPROM_DATA_NOT_READY
 
+        # Skip the EEPROM read once the inserted module is classified
+        if self._sfp_type_valid:
+            return self.UPDATE_DONE
+
         ret = self.UPDATE_DONE
         eeprom_raw = []
         eeprom_raw = self.read_eeprom(0, 1)
         if eeprom_raw and hasattr(self,'sfp_type'):
-            if eeprom_raw[0] in self.SFP_TYPE_CODE_LIST:
+            if eeprom_raw[0] in self.SFP_TYPE_CODE_SET:
                 self.sfp_type = self.SFP_TYPE
-            elif eeprom_raw[0] in self.QSFP_TYPE_CODE_LIST:
+            elif eeprom_raw[0] in self.QSFP_TYPE_CODE_SET:
                 self.sfp_type = self.QSFP_TYPE
-            elif eeprom_raw[0] in self.QSFP_DD_TYPE_CODE_LIST:
+            elif eeprom_raw[0] in self.QSFP_DD_TYPE_CODE_SET:
                 self.sfp_type = self.QSFP_DD_TYPE
-            elif eeprom_raw[0] in self.OSFP_TYPE_CODE_LIST:
+            elif eeprom_raw[0] in self.OSFP_TYPE_CODE_SET:
                 self.sfp_type = self.OSFP_TYPE
             else:
                 ret = self.UNKNOWN_SFP_TYPE_ID
         else:
             ret = self.EEPROM_DATA_NOT_READY
 
+        self._sfp_type_valid = (ret == self.UPDATE_DONE)
+
         return ret
 
     def validate_eeprom_sfp(self):
@@ -414,13 +468,13 @@ class Sfp(SfpOptoeBase):
             return False
 
         id = id_byte_raw[0]
-        if id in self.QSFP_TYPE_CODE_LIST:
+        if id in self.QSFP_TYPE_CODE_SET:
             return self.validate_eeprom_qsfp()
-        elif id in self.SFP_TYPE_CODE_LIST:
+        elif id in self.SFP_TYPE_CODE_SET:
             return self.validate_eeprom_sfp()
-        elif id in self.QSFP_DD_TYPE_CODE_LIST:
+        elif id in self.QSFP_DD_TYPE_CODE_SET:
             return self.validate_eeprom_cmis()
-        elif id in self.OSFP_TYPE_CODE_LIST:
+        elif id in self.OSFP_TYPE_CODE_SET:
             return self.validate_eeprom_cmis()
         else:
             return False
@@ -442,8 +496,10 @@ class Sfp(SfpOptoeBase):
 
         return threshold_dict['temphighalarm'] > temperature
 
-    def __get_error_description(self):
-        if not self.get_presence():
+    def __get_error_description(self, presence=None):
+        if presence is None:
+            presence = self.get_presence()
+        if not presence:
             return self.SFP_STATUS_UNPLUGGED
 
         err_stat = self.SFP_STATUS_BIT_INSERTED
@@ -459,16 +515,8 @@ class Sfp(SfpOptoeBase):
         if err_stat is self.SFP_STATUS_BIT_INSERTED:
             return self.SFP_STATUS_OK
         else:
-            err_desc = ''
-            cnt = 0
-            for key in self.SFP_ERROR_BIT_TO_DESCRIPTION_DICT:
-                if (err_stat & key) != 0:
-                    if cnt > 0:
-                        err_desc = err_desc + "|"
-                        cnt = cnt + 1
-                    err_desc = err_desc + self.SFP_ERROR_BIT_TO_DESCRIPTION_DICT[key]
-
-            return err_desc
+            return "|".join(desc for key, desc in self.SFP_ERROR_BIT_TO_DESCRIPTION_DICT.items()
+                            if (err_stat & key) != 0)
 
     def get_error_description(self):
         """
@@ -488,4 +536,4 @@ class Sfp(SfpOptoeBase):
                 return self.SFP_STATUS_OK
             return state
         except NotImplementedError:
-            return self.__get_error_description()
+            return self.__get_error_description(presence=True)
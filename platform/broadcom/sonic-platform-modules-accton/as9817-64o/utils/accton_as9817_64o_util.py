@@ -31,7 +31,6 @@ Utility Command:
     clean               : uninstall drivers and remove related sysfs nodes
     threshold           : modify thermal threshold
 """
-import subprocess
 import sys
 import logging
 import re
@@ -39,8 +38,14 @@ import time
 import os
 import glob
 import argparse
+import importlib.metadata
 from sonic_py_common.general import getstatusoutput_noshell
 
+try:
+    from smbus2 import SMBus
+except ImportError:
+    SMBus = None
+
 
 PROJECT_NAME = 'as9817_64o'
 version = '0.1.0'
@@ -111,124 +116,217 @@ def my_log(txt):
         print("[DEBUG]"+txt)
     return
 
-def log_os_system(cmd, show):
-    logging.info('Run :'+cmd)
-    status, output = subprocess.getstatusoutput(cmd)
-    #status, output = getstatusoutput_noshell(cmd)
-    my_log (cmd +"with result:" + str(status))
+def log_run(cmd, show):
+    """
+    Runs an argv list without a shell and logs the result
+    """
+    cmd_str = " ".join(cmd)
+    logging.info('Run :'+cmd_str)
+    status, output = getstatusoutput_noshell(cmd)
+    my_log (cmd_str +"with result:" + str(status))
     my_log ("      output:"+output)
     if status:
-        logging.info('Failed :'+cmd)
+        logging.info('Failed :'+cmd_str)
         if show:
-            print('Failed :'+cmd)
+            print('Failed :'+cmd_str)
     return  status, output
 
+def sysfs_write(path, value, show):
+    """
+    Writes value to a sysfs node directly instead of forking a shell
+    to run 'echo value > path'. Returns (status, output) like log_run()
+    """
+    cmd_str = "echo {} > {}".format(value, path)
+    logging.info('Run :'+cmd_str)
+    try:
+        with open(path, 'w') as fd:
+            fd.write(str(value))
+    except (IOError, OSError) as e:
+        my_log (cmd_str +" with error:" + str(e))
+        logging.info('Failed :'+cmd_str)
+        if show:
+            print('Failed :'+cmd_str)
+        return 1, str(e)
+
+    return 0, ""
+
 def driver_check():
-    ret, lsmod = log_os_system("ls /sys/module/*accton*", 0)
-    logging.info('mods:'+lsmod)
-    if ret :
-        return False
-    else :
-        return True
+    mods = glob.glob("/sys/module/*accton*")
+    logging.info('mods:'+" ".join(mods))
+    return len(mods) > 0
 
 ipmi_ko = [
-    'modprobe ipmi_msghandler',
-    'modprobe ipmi_ssif',
-    'modprobe ipmi_si',
-    'modprobe ipmi_devintf']
+    ['modprobe', 'ipmi_msghandler'],
+    ['modprobe', 'ipmi_ssif'],
+    ['modprobe', 'ipmi_si'],
+    ['modprobe', 'ipmi_devintf']]
+
+# modprobe -rq argv for each module of ipmi_ko, in unload order
+ipmi_ko_remove = [['modprobe', '-rq', ko[1]] for ko in reversed(ipmi_ko)]
 
 ATTEMPTS = 5
 INTERVAL = 3
+IPMI_INTERVAL = 60
 
-def init_ipmi_dev_intf():
-    attempts = ATTEMPTS
-    interval = INTERVAL
-
-    while attempts:
-        for i in range(0, len(ipmi_ko)):
-            subprocess.getstatusoutput(ipmi_ko[i])
+# Retries start BACKOFF_START seconds apart and double up to the interval
+BACKOFF_START = 0.05
+# How long to watch for the IPMI device node after loading the drivers
+IPMI_DEV_PROBE_TIME = 1
 
-        if os.path.exists('/dev/ipmi0') or os.path.exists('/dev/ipmidev/0'):
-            return (0, (ATTEMPTS - attempts) * interval)
+def backoff_delay(retry, cap):
+    return min(cap, BACKOFF_START * (2 ** retry))
 
-        for i in reversed(range(0, len(ipmi_ko))):
-            rm = ipmi_ko[i].replace("modprobe", "modprobe -rq")
-            subprocess.getstatusoutput(rm)
+def module_loaded(name):
+    return os.path.isdir('/sys/module/' + name.replace('-', '_'))
 
-        attempts -= 1
-        time.sleep(interval)
+def ipmi_dev_ready():
+    return os.path.exists('/dev/ipmi0') or os.path.exists('/dev/ipmidev/0')
 
-    return (1, ATTEMPTS * interval)
+def init_ipmi_dev_intf():
+    budget = ATTEMPTS * INTERVAL
+    start = time.monotonic()
+    retry = 0
+
+    while True:
+        for ko in ipmi_ko:
+            getstatusoutput_noshell(ko)
+
+        # ipmi_si usually creates the device node right away
+        probe_end = time.monotonic() + IPMI_DEV_PROBE_TIME
+        while True:
+            if ipmi_dev_ready():
+                return (0, time.monotonic() - start)
+            if time.monotonic() >= probe_end:
+                break
+            time.sleep(BACKOFF_START)
+
+        for rm in ipmi_ko_remove:
+            # Skip modules that never got loaded
+            if module_loaded(rm[-1]):
+                getstatusoutput_noshell(rm)
+
+        elapsed = time.monotonic() - start
+        if elapsed >= budget:
+            break
+        time.sleep(min(backoff_delay(retry, INTERVAL), budget - elapsed))
+        retry += 1
+
+    return (1, time.monotonic() - start)
 
 def init_ipmi_oem_cmd():
-    attempts = ATTEMPTS
-    interval = INTERVAL
+    budget = ATTEMPTS * INTERVAL
+    start = time.monotonic()
+    retry = 0
 
-    while attempts:
-        status, output = subprocess.getstatusoutput('ipmitool raw 0x34 0x95')
-        if status:
-            attempts -= 1
-            time.sleep(interval)
-            continue
+    while True:
+        status, output = getstatusoutput_noshell(['ipmitool', 'raw', '0x34', '0x95'])
+        if status == 0:
+            return (0, time.monotonic() - start)
 
-        return (0, (ATTEMPTS - attempts) * interval)
+        elapsed = time.monotonic() - start
+        if elapsed >= budget:
+            break
+        time.sleep(min(backoff_delay(retry, INTERVAL), budget - elapsed))
+        retry += 1
 
-    return (1, ATTEMPTS * interval)
+    return (1, time.monotonic() - start)
 
 def init_ipmi():
-    attempts = ATTEMPTS
-    interval = 60
-
-    while attempts:
-        attempts -= 1
+    budget = ATTEMPTS * IPMI_INTERVAL
+    start = time.monotonic()
+    retry = 0
 
+    while True:
         (status, elapsed_dev) = init_ipmi_dev_intf()
-        if status:
-            time.sleep(max(0, interval - elapsed_dev))
-            continue
-
-        (status, elapsed_oem) = init_ipmi_oem_cmd()
-        if status:
-            time.sleep(max(0, interval - elapsed_dev - elapsed_oem))
-            continue
-
-        print('IPMI dev interface is ready.')
-        return 0
+        if status == 0:
+            (status, elapsed_oem) = init_ipmi_oem_cmd()
+            if status == 0:
+                print('IPMI dev interface is ready.')
+                return 0
+
+        elapsed = time.monotonic() - start
+        if elapsed >= budget:
+            break
+        time.sleep(min(backoff_delay(retry, IPMI_INTERVAL), budget - elapsed))
+        retry += 1
 
     print('Failed to initialize IPMI dev interface')
     return 1
 
 
-kos = [
-    'modprobe i2c_dev',
-    'modprobe i2c_i801',
-    'modprobe i2c_ismt',
-    'modprobe optoe',
-    'modprobe at24',
-    'modprobe i2c-ocores',
-    'modprobe accton_as9817_64_fpga',
-    'modprobe accton_as9817_64_fan',
-    'modprobe accton_as9817_64_psu',
-    'modprobe accton_as9817_64_thermal',
-    'modprobe accton_as9817_64_sys',
-    'modprobe accton_as9817_64_leds'
+# Kernel modules in load order. Each group is loaded by a single
+# 'modprobe -a', which loads its modules one by one in the listed order,
+# and only depends on the groups before it.
+kos_groups = [
+    # I2C adapter drivers. The kernel numbers the adapters in probe order,
+    # and i2c-0 (eeprom_mknod) and the sfp_map buses rely on it, so these
+    # must never be loaded concurrently or reordered.
+    ['i2c_dev',
+     'i2c_i801',
+     'i2c_ismt',
+     'i2c-ocores'],
+    # FPGA, needs i2c-ocores and adds the ocores adapters of the ports
+    ['accton_as9817_64_fpga'],
+    # Client and platform drivers, they register no I2C adapter
+    ['optoe',
+     'at24',
+     'accton_as9817_64_fan',
+     'accton_as9817_64_psu',
+     'accton_as9817_64_thermal',
+     'accton_as9817_64_sys',
+     'accton_as9817_64_leds']
 ]
 
+kos = [['modprobe', '-a'] + group for group in kos_groups]
+
+# modprobe -rq argv for each module of kos, in unload order
+kos_remove = [['modprobe', '-rq', mod] for group in reversed(kos_groups) for mod in reversed(group)]
+
 #EERPOM
 eeprom_mknod =[
-    'echo 24c02 0x56 > /sys/bus/i2c/devices/i2c-0/new_device',
+    ('/sys/bus/i2c/devices/i2c-0/new_device', '24c02 0x56'),
 ]
 
 def eeprom_check():
+    # Probe the EEPROM in-process when smbus2 is available
+    if SMBus is not None:
+        try:
+            with SMBus(0, force=True) as bus:
+                bus.read_byte(0x56)
+        except OSError:
+            return 1
+        return 0
+
     cmd = ["i2cget", "-f", "-y", "0", "0x56"]
     status, output = getstatusoutput_noshell(cmd)
     return status
 
+def modules_dep_outdated():
+    """
+    Tells whether a module of kos_groups is missing from modules.dep (or
+    modules.builtin), i.e. whether depmod has to run before loading them
+    """
+    modules_dir = "/lib/modules/{}".format(os.uname().release)
+    known = set()
+    for name in ("modules.dep", "modules.builtin"):
+        try:
+            with open(os.path.join(modules_dir, name)) as fd:
+                for line in fd:
+                    # "kernel/.../i2c-ocores.ko[.xz]: deps" -> "i2c_ocores"
+                    mod = os.path.basename(line.split(':', 1)[0].strip())
+                    known.add(mod.split('.ko', 1)[0].replace('-', '_'))
+        except IOError:
+            if name == "modules.dep":
+                return True
+
+    return any(mod.replace('-', '_') not in known
+               for group in kos_groups for mod in group)
+
 def driver_install():
     global FORCE
 
     # Load 10G ethernet driver
-    status, output = log_os_system("modprobe ice", 1)
+    status, output = log_run(["modprobe", "ice"], 1)
     if status:
         if FORCE == 0:
             return status
@@ -238,9 +336,17 @@ def driver_install():
         if FORCE == 0:
             return status
 
-    status, output = log_os_system("depmod -ae", 1)
-    for i in range(0,len(kos)):
-        status, output = log_os_system(kos[i], 1)
+    depmod_done = False
+    if modules_dep_outdated():
+        status, output = log_run(["depmod", "-ae"], 1)
+        depmod_done = True
+    for ko in kos:
+        status, output = log_run(ko, 1)
+        if status and not depmod_done:
+            # modules.dep may still be stale, rebuild it and retry once
+            log_run(["depmod", "-ae"], 1)
+            depmod_done = True
+            status, output = log_run(ko, 1)
         if status:
             if FORCE == 0:
                 return status
@@ -251,14 +357,8 @@ def driver_install():
 def driver_uninstall():
     global FORCE
 
-    for i in range(0,len(kos)):
-        rm = kos[-(i+1)].replace("modprobe", "modprobe -rq")
-        rm = rm.replace("insmod", "rmmod")
-        lst = rm.split(" ")
-        if len(lst) > 3:
-            del(lst[3])
-        rm = " ".join(lst)
-        status, output = log_os_system(rm, 1)
+    for rm in kos_remove:
+        status, output = log_run(rm, 1)
         if status:
             if FORCE == 0:
                 return status
@@ -277,10 +377,22 @@ sfp_map =  [
 osfp_start = 0
 osfp_end   = 63
 
+# (new_device path, 'driver address') pairs
 mknod =[
 
 ]
 
+def delete_device_node(node):
+    """
+    Maps a (new_device path, 'driver address') pair to the
+    (delete_device path, address) pair that removes the device
+    """
+    return (node[0].replace('new_device', 'delete_device'), node[1].split()[1])
+
+# delete_device writes for mknod and eeprom_mknod, in removal order
+mknod_remove = [delete_device_node(node) for node in reversed(mknod)]
+eeprom_mknod_remove = [delete_device_node(node) for node in eeprom_mknod]
+
 mkfile = [
     '/tmp/device_threshold.json',
     '/tmp/device_threshold.json.lock'
@@ -289,60 +401,60 @@ mkfile = [
 def device_install():
     global FORCE
 
-    for i in range(0,len(mknod)):
+    for target, dev in mknod:
         #for pca954x need times to built new i2c buses
-        if mknod[i].find('pca954') != -1:
+        if dev.find('pca954') != -1:
            time.sleep(1)
 
-        status, output = log_os_system(mknod[i], 1)
+        status, output = sysfs_write(target, dev, 1)
         if status:
             print(output)
             if FORCE == 0:
                 return status
 
     # Select I2C relay channel to MB_EEPROM
-    log_os_system("i2cset -f -a -y 0 0x78 0x00 0x01", 1)
+    log_run(["i2cset", "-f", "-a", "-y", "0", "0x78", "0x00", "0x01"], 1)
     time.sleep(0.2)
 
     ret=eeprom_check()
     if ret==0:
-        log_os_system(eeprom_mknod[0], 1)
+        sysfs_write(eeprom_mknod[0][0], eeprom_mknod[0][1], 1)
         time.sleep(0.2)
         exists = os.path.isfile('/sys/bus/i2c/devices/0-0056/eeprom')
         if (exists is False):
-            subprocess.call('echo 0x56 > /sys/bus/i2c/devices/i2c-1/delete_device', shell=True)
-
-    for i in range(0,len(sfp_map)):
-        if i > osfp_end:
-            status, output =log_os_system("echo optoe2 0x50 > /sys/bus/i2c/devices/i2c-"+str(sfp_map[i])+"/new_device", 1)
-        else:
-            status, output =log_os_system("echo optoe3 0x50 > /sys/bus/i2c/devices/i2c-"+str(sfp_map[i])+"/new_device", 1)
+            # Drop the node created above on i2c-0 again
+            target, addr = eeprom_mknod_remove[0] #0x56
+            sysfs_write(target, addr, 0)
+
+    for i, bus in enumerate(sfp_map):
+        drv = "optoe2" if i > osfp_end else "optoe3"
+        target = "/sys/bus/i2c/devices/i2c-{}/new_device".format(bus)
+        status, output = sysfs_write(target, drv + " 0x50", 1)
         if status:
             print(output)
             if FORCE == 0:
                 return status
 
-    # Release RESET pin for all OSFP.
-    for i in range(0, (osfp_end + 1)):
-        status, output = log_os_system("echo 0 > /sys/devices/platform/as9817_64_fpga/module_reset_{}".format(i + 1), 1)
+    # Release RESET pin and disable Low Power Mode for all OSFP.
+    for port in range(1, osfp_end + 2):
+        status, output = sysfs_write("/sys/devices/platform/as9817_64_fpga/module_reset_{}".format(port), 0, 1)
         if status:
             print(output)
 
-    # Disable Low Power Mode for all OSFP.
-    for i in range(0, (osfp_end + 1)):
-        status, output = log_os_system("echo 0 > /sys/devices/platform/as9817_64_fpga/module_lp_mode_{}".format(i + 1), 1)
+        status, output = sysfs_write("/sys/devices/platform/as9817_64_fpga/module_lp_mode_{}".format(port), 0, 1)
         if status:
             print(output)
 
     # Prevent permission issues between root or admin users for sonic_platform/helper.py
-    for i in range(0,len(mkfile)):
+    for path in mkfile:
         try:
-            # Create empty file
-            open(mkfile[i], 'a').close()
-            os.chmod(mkfile[i], 0o644)
+            # Create empty file, the mode is applied on creation
+            fd = os.open(path, os.O_CREAT | os.O_RDWR, 0o644)
+            os.close(fd)
+            # Also fix up a file that already existed or lost bits to umask
+            os.chmod(path, 0o644)
         except OSError:
-            print('Failed : creating the file %s.' % (mkfile[i]))
-            os.chmod(mkfile[i], 0o644)
+            print('Failed : creating the file %s.' % (path))
             if FORCE == 0:
                 return -1
 
@@ -352,20 +464,16 @@ def device_install():
 def device_uninstall():
     global FORCE
 
-    for i in range(0,len(sfp_map)):
-        target = "/sys/bus/i2c/devices/i2c-"+str(sfp_map[i])+"/delete_device"
-        status, output =log_os_system("echo 0x50 > "+ target, 1)
+    for bus in sfp_map:
+        target = "/sys/bus/i2c/devices/i2c-{}/delete_device".format(bus)
+        status, output = sysfs_write(target, "0x50", 1)
         if status:
             print(output)
             if FORCE == 0:
                 return status
 
-    for i in range(len(mknod)):
-        target = mknod[-(i+1)]
-        temp = target.split()
-        del temp[1]
-        temp[-1] = temp[-1].replace('new_device', 'delete_device')
-        status, output = log_os_system(" ".join(temp), 1)
+    for target, addr in mknod_remove:
+        status, output = sysfs_write(target, addr, 1)
         if status:
             print(output)
             if FORCE == 0:
@@ -374,19 +482,15 @@ def device_uninstall():
     # Deal with for del 0x56 sysfs device
     exists = os.path.isfile('/sys/bus/i2c/devices/0-0056/eeprom')
     if (exists is True):
-        target = eeprom_mknod[0] #0x56
-
-    temp = target.split()
-    del temp[1]
-    temp[-1] = temp[-1].replace('new_device', 'delete_device')
-    status, output = log_os_system(" ".join(temp), 1)
-    if status:
-        print(output)
-        if FORCE == 0:
-           return status
+        target, addr = eeprom_mknod_remove[0] #0x56
+        status, output = sysfs_write(target, addr, 1)
+        if status:
+            print(output)
+            if FORCE == 0:
+               return status
 
-    for i in range(0,len(mkfile)):
-        status, output = log_os_system('rm -f ' + mkfile[i], 1)
+    for path in mkfile:
+        status, output = log_run(['rm', '-f', path], 1)
         if status:
             print(output)
             if FORCE == 0:
@@ -403,15 +507,22 @@ def system_ready():
 
 PLATFORM_ROOT_PATH = '/usr/share/sonic/device'
 PLATFORM_API2_WHL_FILE_PY3 ='sonic_platform-1.0-py3-none-any.whl'
+def sonic_platform_installed():
+    # Look up the installed distribution, like 'pip3 show sonic-platform'
+    try:
+        importlib.metadata.distribution('sonic-platform')
+    except importlib.metadata.PackageNotFoundError:
+        return False
+    return True
+
 def do_sonic_platform_install():
     device_path = "{}{}{}{}".format(PLATFORM_ROOT_PATH, '/x86_64-accton_', PROJECT_NAME, '-r0')
     SONIC_PLATFORM_BSP_WHL_PKG_PY3 = "/".join([device_path, PLATFORM_API2_WHL_FILE_PY3])
 
     #Check API2.0 on py whl file
-    status, output = log_os_system("pip3 show sonic-platform > /dev/null 2>&1", 0)
-    if status:
+    if not sonic_platform_installed():
         if os.path.exists(SONIC_PLATFORM_BSP_WHL_PKG_PY3):
-            status, output = log_os_system("pip3 install "+ SONIC_PLATFORM_BSP_WHL_PKG_PY3, 1)
+            status, output = log_run(["pip3", "install", SONIC_PLATFORM_BSP_WHL_PKG_PY3], 1)
             if status:
                 print("Error: Failed to install {}".format(PLATFORM_API2_WHL_FILE_PY3))
                 return status
@@ -425,12 +536,11 @@ def do_sonic_platform_install():
     return
 
 def do_sonic_platform_clean():
-    status, output = log_os_system("pip3 show sonic-platform > /dev/null 2>&1", 0)
-    if status:
+    if not sonic_platform_installed():
         print('{} does not install, not need to uninstall'.format(PLATFORM_API2_WHL_FILE_PY3))
 
     else:
-        status, output = log_os_system("pip3 uninstall sonic-platform -y", 0)
+        status, output = log_run(["pip3", "uninstall", "sonic-platform", "-y"], 0)
         if status:
             print('Error: Failed to uninstall {}'.format(PLATFORM_API2_WHL_FILE_PY3))
             return status
@@ -439,6 +549,21 @@ def do_sonic_platform_clean():
 
     return
 
+FAN_HWMON_PATH = '/sys/devices/platform/as9817_64_fan/hwmon'
+
+def fan_pwm_paths():
+    """
+    Lists the fan*_pwm nodes of the fan hwmon device
+    """
+    try:
+        with os.scandir(FAN_HWMON_PATH) as it:
+            hwmon_dir = next(it).path
+        with os.scandir(hwmon_dir) as it:
+            return [entry.path for entry in it
+                    if entry.name.startswith('fan') and entry.name.endswith('_pwm')]
+    except (OSError, StopIteration):
+        return []
+
 def do_install():
     print("Checking system....")
     if driver_check() == False:
@@ -460,15 +585,11 @@ def do_install():
         print(PROJECT_NAME.upper()+" devices detected....")
 
     # Turn off LOC LED if needed
-    log_os_system("echo 0 > /sys/devices/platform/as9817_64_led/led_loc", 1)
+    sysfs_write("/sys/devices/platform/as9817_64_led/led_loc", 0, 1)
 
     # Chnage all fan_pwm to 67%
-    for filename in glob.glob("/sys/devices/platform/as9817_64_fan/hwmon/*/fan*_pwm"):
-        try:
-            with open(filename, 'w') as fd:
-                fd.write(str(FAN_PWM))
-        except IOError as e:
-            pass
+    for filename in fan_pwm_paths():
+        sysfs_write(filename, FAN_PWM, 1)
 
     do_sonic_platform_install()
 
@@ -499,24 +620,25 @@ def do_uninstall():
     return
 
 def device_exist():
-    ret1, log = log_os_system("ls "+i2c_prefix+"*0070", 0)
-    ret2, log = log_os_system("ls "+i2c_prefix+"i2c-2", 0)
-    return not(ret1 or ret2)
+    return len(glob.glob(i2c_prefix+"*0070")) > 0 and \
+           os.path.exists(i2c_prefix+"i2c-2")
 
 THRESHOLD_RANGE_LOW = 30.0
 THRESHOLD_RANGE_HIGH = 110.0
-# Code to initialize chassis object
-init_chassis_code = \
-    "import sonic_platform.platform\n"\
-    "platform = sonic_platform.platform.Platform()\n"\
-    "chassis = platform.get_chassis()\n\n"
+# Code to collect the thermals of the chassis and its PSUs. Only the Thermal
+# and Psu objects are built; a full Chassis would also probe every SFP EEPROM,
+# the fans, the components and the system EEPROM just to reach them.
+init_thermals_code = \
+    "from sonic_platform.chassis import NUM_THERMAL, NUM_PSU\n"\
+    "from sonic_platform.thermal import Thermal\n"\
+    "from sonic_platform.psu import Psu\n"\
+    "all_thermals = [Thermal(index) for index in range(NUM_THERMAL)]\n"\
+    "for index in range(NUM_PSU):\n"\
+    "    all_thermals += Psu(index).get_all_thermals()\n\n"
 
 # Looking for thermal
 looking_for_thermal_code = \
     "thermal = None\n"\
-    "all_thermals = chassis.get_all_thermals()\n"\
-    "for psu in chassis.get_all_psus():\n"\
-    "    all_thermals += psu.get_all_thermals()\n"\
     "for tmp in all_thermals:\n"\
     "    if '{}' == tmp.get_name():\n"\
     "        thermal = tmp\n"\
@@ -526,18 +648,15 @@ looking_for_thermal_code = \
     "    exit(1)\n\n"
 
 def avaliable_thermals():
-    global init_chassis_code
+    global init_thermals_code
 
     get_all_thermal_name_code = \
         "thermal_list = []\n"\
-        "all_thermals = chassis.get_all_thermals()\n"\
-        "for psu in chassis.get_all_psus():\n"\
-        "    all_thermals += psu.get_all_thermals()\n"\
         "for tmp in all_thermals:\n"\
         "    thermal_list.append(tmp.get_name())\n"\
         "print(str(thermal_list)[1:-1])\n"
 
-    all_code = "{}{}".format(init_chassis_code, get_all_thermal_name_code)
+    all_code = "{}{}".format(init_thermals_code, get_all_thermal_name_code)
 
     status, output = getstatusoutput_noshell(["docker", "exec", "pmon", "python3", "-c", all_code])
     if status != 0:
@@ -558,48 +677,16 @@ def restricted_float(x):
 
     return x
 
-def get_high_threshold(name):
-    global init_chassis_code, looking_for_thermal_code
-
-    get_high_threshold_code = \
-        "try:\n"\
-        "    print(thermal.get_high_threshold())\n"\
-        "    exit(0)\n"\
-        "except NotImplementedError:\n"\
-        "    print('Not implement the get_high_threshold method!')\n"\
-        "    exit(1)"
-
-    all_code = "{}{}{}".format(init_chassis_code, looking_for_thermal_code.format(name, name),
-                               get_high_threshold_code)
-
-    status, output = getstatusoutput_noshell(["docker", "exec", "pmon", "python3", "-c", all_code])
-    if status == 1:
-        return None
-
-    return float(output)
-
-def get_high_crit_threshold(name):
-    global init_chassis_code, looking_for_thermal_code
-
-    get_high_crit_threshold_code = \
-        "try:\n"\
-        "    print(thermal.get_high_critical_threshold())\n"\
-        "    exit(0)\n"\
-        "except NotImplementedError:\n"\
-        "    print('Not implement the get_high_critical_threshold method!')\n"\
-        "    exit(1)"
-
-    all_code = "{}{}{}".format(init_chassis_code, looking_for_thermal_code.format(name, name),
-                               get_high_crit_threshold_code)
-
-    status, output = getstatusoutput_noshell(["docker", "exec", "pmon", "python3", "-c", all_code])
-    if status == 1:
-        return None
-
-    return float(output)
+# Reading a current threshold, None if it is not available
+get_current_threshold_code = \
+    "def get_current_threshold(getter):\n"\
+    "    try:\n"\
+    "        return float(getter())\n"\
+    "    except (NotImplementedError, TypeError, ValueError):\n"\
+    "        return None\n\n"
 
 def do_threshold():
-    global args, init_chassis_code, looking_for_thermal_code
+    global args, init_thermals_code, looking_for_thermal_code
 
     if args.list:
         print("Thermals: " + avaliable_thermals())
@@ -609,20 +696,24 @@ def do_threshold():
         print("The following arguments are required: -t")
         return
 
+    if args.high_threshold is not None and args.high_crit_threshold is not None and \
+        args.high_threshold >= args.high_crit_threshold:
+        print("Invalid Threshold!(High threshold can not be more than " \
+              "or equal to high critical threshold.)")
+        exit(1)
+
+    # The current thresholds are checked and the new ones applied by a
+    # single program, so pmon is entered and the thermals built only once.
+    check_threshold_code = ""
     set_threshold_code = ""
     if args.high_threshold is not None:
-        if args.high_crit_threshold is not None and \
-            args.high_threshold >= args.high_crit_threshold:
-           print("Invalid Threshold!(High threshold can not be more than " \
-                 "or equal to high critical threshold.)")
-           exit(1)
-
-        high_crit = get_high_crit_threshold(args.thermal)
-        if high_crit is not None and \
-           args.high_threshold >= high_crit:
-           print("Invalid Threshold!(High threshold can not be more than " \
-                 "or equal to high critical threshold.)")
-           exit(1)
+        check_threshold_code += \
+            "high_crit = get_current_threshold(thermal.get_high_critical_threshold)\n"\
+            "if high_crit is not None and {} >= high_crit:\n"\
+            "    print('Invalid Threshold!(High threshold can not be more than '\n"\
+            "          'or equal to high critical threshold.)')\n"\
+            "    exit(1)\n"\
+            "\n".format(args.high_threshold)
 
         set_threshold_code += \
             "try:\n"\
@@ -635,12 +726,13 @@ def do_threshold():
             "\n".format(args.high_threshold, args.thermal)
 
     if args.high_crit_threshold is not None:
-        high = get_high_threshold(args.thermal)
-        if high is not None and \
-            args.high_crit_threshold <= high:
-            print("Invalid Threshold!(High critical threshold can not " \
-                  "be less than or equal to high threshold.)")
-            exit(1)
+        check_threshold_code += \
+            "high = get_current_threshold(thermal.get_high_threshold)\n"\
+            "if high is not None and {} <= high:\n"\
+            "    print('Invalid Threshold!(High critical threshold can not '\n"\
+            "          'be less than or equal to high threshold.)')\n"\
+            "    exit(1)\n"\
+            "\n".format(args.high_crit_threshold)
 
         set_threshold_code += \
             "try:\n"\
@@ -655,10 +747,13 @@ def do_threshold():
     if set_threshold_code == "":
         return
 
-    all_code = "{}{}{}".format(init_chassis_code, looking_for_thermal_code.format(args.thermal, args.thermal), set_threshold_code)
+    all_code = "{}{}{}{}{}".format(init_thermals_code, looking_for_thermal_code.format(args.thermal, args.thermal),
+                                   get_current_threshold_code, check_threshold_code, set_threshold_code)
 
     status, output = getstatusoutput_noshell(["docker", "exec", "pmon", "python3", "-c", all_code])
     print(output)
+    if status:
+        exit(1)
 
 if __name__ == "__main__":
     main()